@@ -2,21 +2,53 @@
 # image_sync.py
 # Downloads, processes, uploads and archives graphics with a 14 day auto-delete
 
+import io
 import os
 import sys
 import json
+import atexit
 import hashlib
 import logging
+import logging.handlers
 import ftplib
+import queue
+import random
+import socket
+import sqlite3
 import time
 import threading
 import schedule
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image, ImageEnhance, ImageOps, ImageFilter
-import shutil
+import PIL
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# Optional fast path for the enhancement chain; PIL is used when missing
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Optional libjpeg-turbo decoder; the constructor loads the shared
+# library, so any failure there also falls back to Pillow's decoder
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
 
 # Global configuration and state
 CONFIG_FILE = "config.json"
@@ -30,22 +62,416 @@ for d in [DOWNLOAD_DIR, PROCESSED_DIR, ARCHIVE_DIR]:
     os.makedirs(d, exist_ok=True)
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def _make_log_handlers():
+    handlers = [
         logging.FileHandler(LOG_FILE, encoding='utf-8'),
         logging.StreamHandler(sys.stdout)
     ]
-)
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+# Worker threads only drop records onto a queue; a listener thread does
+# the formatting and file/console writes, so the hot loops never block on
+# the logging lock or disk
+_log_queue = queue.Queue(-1)
+# Attach the queue handler directly rather than via basicConfig: that
+# would give it a default formatter, which QueueHandler.prepare() bakes
+# into the record before the listener's handlers format it again
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *_make_log_handlers(), respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+def _init_worker_logging():
+    """Process-pool initializer: children inherit the queue handler but
+    not the listener thread, so rewire them to direct handlers."""
+    logging.getLogger().handlers = _make_log_handlers()
+
+# Modern Pillow moved the filters to Image.Resampling; Pillow-SIMD tracks
+# older releases where LANCZOS still lives on Image directly
+LANCZOS = getattr(Image, "Resampling", Image).LANCZOS
+
+# Download stream chunk size. Large chunks amortize per-update hashing
+# overhead (hashlib releases the GIL on big buffers) and keep the Python
+# loop short; hashing each chunk as it arrives overlaps with the next recv.
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Stored digests are truncated to 16 bytes (32 hex chars) - plenty for
+# change detection and it keeps processed_hashes.json small
+HASH_PREFIX_LEN = 32
+
+def backoff_delay(previous, base=1.0, cap=8.0):
+    """Next retry delay using decorrelated jitter, capped at a few seconds.
+
+    Plain 2**attempt sleeps made every worker that failed against the same
+    origin retry in lockstep; jitter spreads the re-hits out and the cap
+    stops a worker thread being parked for long stretches.
+    """
+    return min(cap, random.uniform(base, max(previous, base) * 3))
+
+def url_filename(url):
+    """Extract a safe local filename from a URL, or None.
+
+    urlsplit keeps the query string and fragment out of the name (a plain
+    basename of 'photo.jpg?v=2' would leak '?v=2' into the filesystem)
+    and PurePosixPath takes the final path segment without the split
+    chains the old extraction used. Anything empty or that could escape
+    the target directory is rejected rather than repaired.
+    """
+    try:
+        name = PurePosixPath(urlsplit(url).path).name
+    except (ValueError, TypeError):
+        return None
+    if not name or name in (".", "..") or "/" in name or "\\" in name or "\x00" in name:
+        return None
+    return name
+
+def new_content_hasher():
+    """Return the fastest available hasher for change detection.
+
+    Dedup hashing has no security requirement, so prefer BLAKE3 (SIMD,
+    internally parallel) and fall back to SHA-256, which OpenSSL
+    accelerates with SHA-NI on modern x86.
+    """
+    if blake3 is not None:
+        return blake3.blake3()
+    return hashlib.sha256()
+
+# Which scheme new_content_hasher() resolves to; persisted with the hash
+# store so a scheme change invalidates stale digests instead of silently
+# never matching (and re-recording) every URL one by one
+HASH_SCHEME = "blake3" if blake3 is not None else "sha256"
+
+# Per-pixel luminance weights matching PIL's L-mode conversion,
+# precomputed once rather than rebuilt for every image
+_LUMA_WEIGHTS = np.asarray([0.299, 0.587, 0.114], dtype=np.float32) if np is not None else None
+
+# PIL enhancers in application order; factors of 1.0 are no-ops and are
+# skipped without touching the image
+_ENHANCER_CLASSES = (
+    ("sharpness", ImageEnhance.Sharpness),
+    ("contrast", ImageEnhance.Contrast),
+    ("brightness", ImageEnhance.Brightness),
+    ("color", ImageEnhance.Color),
+)
+
+def apply_enhancements_fused(img, enhancements):
+    """Apply sharpness/contrast/brightness/color on one float32 array.
+
+    The PIL ImageEnhance chain allocates a fresh full-resolution image per
+    factor; here the whole chain runs as vectorized numpy/OpenCV ops over
+    a single buffer (same order and semantics as the enhancer classes).
+    Only called when numpy and cv2 are importable and the image is RGB.
+    """
+    arr = np.asarray(img, dtype=np.float32)
+
+    sharpness = float(enhancements.get("sharpness", 1.0))
+    contrast = float(enhancements.get("contrast", 1.0))
+    brightness = float(enhancements.get("brightness", 1.0))
+    color = float(enhancements.get("color", 1.0))
+
+    if sharpness != 1.0:
+        # PIL Sharpness blends against its SMOOTH kernel
+        smooth = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+        blurred = cv2.filter2D(arr, -1, smooth)
+        arr = blurred + sharpness * (arr - blurred)
+    if contrast != 1.0:
+        # PIL Contrast interpolates against the mean grey level
+        mean = float((arr @ _LUMA_WEIGHTS).mean())
+        arr = mean + contrast * (arr - mean)
+    if brightness != 1.0:
+        arr *= brightness
+    if color != 1.0:
+        # PIL Color interpolates against the per-pixel grayscale
+        gray = arr @ _LUMA_WEIGHTS
+        arr = gray[..., None] + color * (arr - gray[..., None])
+
+    np.clip(arr, 0, 255, out=arr)
+    return Image.fromarray(arr.astype(np.uint8))
+
+def unsharp_mask_fast(img, radius, percent, threshold):
+    """Unsharp mask via OpenCV's separable Gaussian on a float32 array.
+
+    cv2.GaussianBlur runs as two 1-D passes, so the blur cost grows with
+    the radius instead of its square - at the large radii some configs
+    use, that is most of the filter's runtime gone. The composite matches
+    ImageFilter.UnsharpMask: amplify the detail (src - blur) by percent,
+    but only where it exceeds the threshold. Only called when numpy and
+    cv2 are importable (see the PIL fallback at the call site).
+    """
+    arr = np.asarray(img, dtype=np.float32)
+    # The composite is memory-bound, so it runs in place over the two
+    # buffers the blur already produced instead of allocating fresh
+    # full-frame temporaries for diff/sharpened/where. blurred is reused
+    # to hold the detail signal once the blur itself is consumed.
+    blurred = cv2.GaussianBlur(arr, (0, 0), sigmaX=float(radius))
+    np.subtract(arr, blurred, out=blurred)
+    if threshold > 0:
+        # Zero sub-threshold detail; the boolean mask is the only extra
+        # allocation and is a quarter the size of a float frame
+        blurred[np.abs(blurred) < threshold] = 0.0
+    np.multiply(blurred, percent / 100.0, out=blurred)
+    np.add(arr, blurred, out=arr)
+    np.clip(arr, 0, 255, out=arr)
+    return Image.fromarray(arr.astype(np.uint8), mode=img.mode)
+
+def decode_jpeg_turbo(content, resize_to):
+    """Decode JPEG bytes with libjpeg-turbo into a PIL image.
+
+    Roughly 2x faster than Pillow's libjpeg path and lands straight in a
+    numpy buffer, skipping a copy. resize_to enables DCT-domain
+    downscaling equivalent to the draft() hint: pick the most aggressive
+    1/2, 1/4 or 1/8 factor that keeps both dimensions at 2x the target so
+    the LANCZOS pass still has headroom. Caller handles fallback.
+    """
+    scale = (1, 1)
+    if resize_to:
+        width, height = _turbojpeg.decode_header(content)[:2]
+        tw, th = int(resize_to[0]) * 2, int(resize_to[1]) * 2
+        for num, den in ((1, 2), (1, 4), (1, 8)):
+            if width * num // den >= tw and height * num // den >= th:
+                scale = (num, den)
+            else:
+                break
+    arr = _turbojpeg.decode(content, pixel_format=TJPF_RGB, scaling_factor=scale)
+    return Image.fromarray(arr, mode="RGB")
+
+def process_image_file(image_src, out_filename, merged_settings):
+    """Run the CPU-bound PIL pipeline for one image.
+
+    image_src is either raw image bytes (the usual case - decoded straight
+    from the download buffer) or a filesystem path. Module-level (not a
+    method) so it pickles cleanly into the process pool workers. Returns
+    the processed file path, or None on failure.
+    """
+    src_label = out_filename if isinstance(image_src, (bytes, bytearray)) else os.path.basename(image_src)
+    try:
+        crop_box = merged_settings.get("crop_box")
+        resize_to = merged_settings.get("resize_to", [1920, 1920])
+        if not (isinstance(resize_to, list) and len(resize_to) == 2):
+            resize_to = None
+            # Filter cost scales with pixel count (UnsharpMask especially,
+            # O(W*H*radius)), so filtering an unresized source can be
+            # orders of magnitude slower than the same filters at 1920px
+            logger.warning(
+                f"{src_label}: no resize_to set - filters will run at full "
+                f"source resolution, which can be very slow for large images")
+
+        # Open image. In-memory JPEGs (sniffed by magic bytes) go through
+        # libjpeg-turbo when it is available; crop boxes are in source
+        # coordinates, so DCT downscaling is suppressed for those.
+        img = None
+        if (_turbojpeg is not None and np is not None
+                and isinstance(image_src, (bytes, bytearray))
+                and bytes(image_src[:3]) == b"\xff\xd8\xff"):
+            try:
+                img = decode_jpeg_turbo(image_src, resize_to if not crop_box else None)
+            except Exception as e:
+                logger.warning(f"TurboJPEG decode failed for {src_label}, using Pillow: {e}")
+        if img is None:
+            if isinstance(image_src, (bytes, bytearray)):
+                img = Image.open(io.BytesIO(image_src))
+            else:
+                img = Image.open(image_src)
+
+        # For JPEGs, let libjpeg decode straight to a pre-downscaled size
+        # (DCT-domain 1/2, 1/4, 1/8 scaling is nearly free). Keep at least
+        # 2x the target so the LANCZOS pass still has headroom, and skip it
+        # when cropping since crop boxes are in source coordinates. A no-op
+        # on non-JPEG loaders and on frames already decoded by turbo.
+        if resize_to and not crop_box:
+            try:
+                img.draft('RGB', (int(resize_to[0]) * 2, int(resize_to[1]) * 2))
+            except Exception:
+                pass
+
+        # Handle transparency (GIF/PNG etc.). By default flatten onto white
+        # with a single alpha_composite pass - the old new+paste approach
+        # walked the frame twice. Set flatten_alpha false to keep the alpha
+        # channel and let WebP encode it directly.
+        if img.mode in ('RGBA', 'LA', 'P'):
+            if merged_settings.get("flatten_alpha", True):
+                try:
+                    bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
+                    img = Image.alpha_composite(bg, img.convert('RGBA')).convert('RGB')
+                except Exception:
+                    img = img.convert('RGB')
+            else:
+                img = img.convert('RGBA')
+
+        original_size = img.size
+        logger.info(f"Processing {src_label} - Original size: {original_size}")
+
+        # Apply crop if specified
+        if crop_box and isinstance(crop_box, list) and len(crop_box) == 4:
+            try:
+                img = img.crop(crop_box)
+                logger.info(f"Cropped to: {img.size}")
+            except Exception as e:
+                logger.warning(f"Could not apply crop {crop_box}: {e}")
+
+        # Resize straight to the final target in one LANCZOS pass. The old
+        # pipeline first blew the image up to max_processing_dimension and
+        # ran every filter on that ~4x-larger intermediate before scaling
+        # back down - pure wasted bandwidth, since nothing here benefits
+        # from supersampling.
+        if resize_to:
+            target = (int(resize_to[0]), int(resize_to[1]))
+            if img.size != target:
+                try:
+                    img = ImageOps.contain(img, target, method=LANCZOS)
+                    logger.info(f"Resized to {img.size[0]}x{img.size[1]}")
+                except Exception as e:
+                    logger.warning(f"Could not resize image: {e}")
+
+        # Apply auto contrast if requested
+        enhancements = merged_settings.get("enhancements", {}) or {}
+        if enhancements.get("apply_autocontrast", False):
+            try:
+                # getextrema is a single cheap histogram pass; when every
+                # channel already spans 0..255 autocontrast is an identity
+                # remap, so skip its full per-pixel pass (common for
+                # web-sourced JPEGs that are already stretched)
+                extrema = img.getextrema()
+                if img.mode in ("L", "I", "F"):
+                    extrema = (extrema,)
+                if all(lo == 0 and hi == 255 for lo, hi in extrema):
+                    logger.info("Skipped auto contrast (histogram already full range)")
+                else:
+                    img = ImageOps.autocontrast(img)
+                    logger.info("Applied auto contrast")
+            except Exception as e:
+                logger.warning(f"Could not apply auto contrast: {e}")
+
+        # Apply other enhancements. Build the plan of non-identity factors
+        # first - the common all-defaults config then skips this stage
+        # without converting the image at all.
+        plan = [(name, cls, factor) for name, cls in _ENHANCER_CLASSES
+                if (factor := float(enhancements.get(name, 1.0))) != 1.0]
+        fused = False
+        if plan and np is not None and cv2 is not None and img.mode == 'RGB':
+            # Fused numpy/OpenCV pass when available
+            try:
+                img = apply_enhancements_fused(img, enhancements)
+                fused = True
+            except Exception as e:
+                logger.warning(f"Fused enhancement pass failed, falling back to PIL: {e}")
+
+        if plan and not fused:
+            # One PIL enhancer (and one image copy) per remaining factor
+            for enhancer_name, enhancer_class, factor in plan:
+                try:
+                    img = enhancer_class(img).enhance(factor)
+                    logger.info(f"Applied {enhancer_name} with factor {factor}")
+                except Exception as e:
+                    logger.warning(f"Could not apply {enhancer_name}: {e}")
+
+        # Apply unsharp mask if specified - single C-level pass, and unlike
+        # the old blur+blend approach the threshold actually takes effect.
+        # NOTE: this must stay after the resize above; UnsharpMask cost is
+        # proportional to pixel count x radius, so sharpening the full-size
+        # source would redo the same work on many times the pixels
+        unsharp_mask = merged_settings.get("unsharp_mask")
+        if unsharp_mask:
+            try:
+                radius = unsharp_mask.get("radius", 2)
+                percent = unsharp_mask.get("percent", 150)
+                threshold = unsharp_mask.get("threshold", 3)
+
+                # All-zero settings mean "off" (the default config ships
+                # them that way); the PIL filter treats that as a silent
+                # no-op but cv2.GaussianBlur rejects sigma 0, so skip the
+                # stage entirely - same identity skipping as the
+                # enhancement factors above
+                if percent != 0 and radius > 0:
+                    if np is not None and cv2 is not None and img.mode in ("RGB", "L"):
+                        img = unsharp_mask_fast(img, radius, percent, threshold)
+                    else:
+                        img = img.filter(ImageFilter.UnsharpMask(radius=radius, percent=percent, threshold=threshold))
+                    logger.info(f"Applied unsharp mask with radius={radius}, percent={percent}, threshold={threshold}")
+            except Exception as e:
+                logger.warning(f"Could not apply unsharp mask: {e}")
+
+        # Encode as WebP straight into memory - the bytes go to FTP
+        # without a round trip through PROCESSED_DIR (disk is only touched
+        # for archiving or when an upload fails; see upload_and_archive).
+        # method=4 encodes ~3x faster than the old method=6 for a 1-2%
+        # size difference; override via webp_method if size wins
+        quality = int(merged_settings.get("quality", 60))
+        webp_method = int(merged_settings.get("webp_method", 4))
+        try:
+            buf = io.BytesIO()
+            # Explicitly drop EXIF/ICC - depending on the Pillow version
+            # the source metadata can otherwise be carried into the output,
+            # and these thumbnails don't need it; smaller files upload faster
+            img.save(buf, "WEBP", quality=quality, method=webp_method,
+                     exif=b"", icc_profile=None)
+            logger.info(f"Encoded {out_filename} ({buf.tell()} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to encode {out_filename}: {e}")
+            return None
+
+        return out_filename, buf.getvalue()
+
+    except Exception as e:
+        logger.error(f"Error processing {src_label}: {e}")
+        return None
+
+class _TunedFTP(ftplib.FTP):
+    """FTP session with a 1 MiB send buffer on each data connection.
+
+    Uploads move over the per-transfer data socket, not the control
+    socket, so the buffer has to be enlarged here as the connection is
+    made. A bigger SO_SNDBUF lets the kernel keep the TCP window full
+    between 1 MiB storbinary blocks; some stacks clamp the value, hence
+    the best-effort try/except.
+    """
+
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = super().ntransfercmd(cmd, rest)
+        try:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        except Exception:
+            pass
+        return conn, size
+
+
 class ImageProcessor:
     def __init__(self):
         self.config = self.load_config()
-        self.ftp_lock = threading.Lock()
+        # Hoisted once; merge_settings results are memoized against these
+        self.default_settings = self.config.get("processing", {})
+        # Pool of logged-in FTP sessions, reused across uploads in a cycle
+        self.ftp_pool = queue.Queue()
+        self.db_lock = threading.Lock()
+        # Cache of hash records touched this run; rows are pulled from
+        # SQLite on first use (get_hash_entry) rather than loaded en masse
         self.processed_hashes = {}
-        self.load_processed_hashes()
+        self._init_hash_db()
+        # CPU-bound PIL work runs here during a cycle; created in run()
+        self.process_pool = None
+        # Cycle-wide archive timestamp; set at the top of each run()
+        self.run_timestamp = None
+        # One session for all downloads: keep-alive connection reuse saves
+        # a TCP+TLS handshake per image when URLs share a host (the common
+        # CDN case). Pool capacity tracks the downloader thread count so
+        # urllib3 never discards a connection a worker could have reused.
+        self.http = requests.Session()
+        n_downloaders = int(self.config.get("download", {}).get(
+            "concurrent_downloads",
+            self.config.get("ftp", {}).get("concurrent_uploads", 5)))
+        pool_size = max(16, 2 * n_downloaders)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
         # optional runtime counter for cycle-based forcing (not used by default)
         self.run_counter = 0
 
@@ -58,49 +484,156 @@ class ImageProcessor:
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def load_processed_hashes(self):
-        """Load previously processed image hashes from file (backwards-compatible)"""
+    def _init_hash_db(self):
+        """Open (and if needed create) the SQLite hash store.
+
+        WAL mode keeps single-row writes cheap and lets the downloader
+        threads update records without blocking each other on a full-file
+        rewrite the way the old JSON map did.
+        """
+        db_path = os.path.join(ARCHIVE_DIR, "processed_hashes.db")
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL still survives crashes (at worst the last
+        # not-yet-checkpointed commit is replayed) but skips an fsync per
+        # single-row upsert
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY,"
+            " hash BLOB,"
+            " timestamp TEXT,"
+            " etag TEXT,"
+            " last_modified TEXT)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        # A different hashing scheme means none of the stored digests can
+        # ever match again - drop them in one pass rather than letting
+        # every URL miss and re-record individually
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'hash_scheme'"
+        ).fetchone()
+        if row and row[0] != HASH_SCHEME:
+            logger.info(f"Hash scheme changed {row[0]} -> {HASH_SCHEME}; invalidating stored hashes")
+            self.db.execute("DELETE FROM urls")
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('hash_scheme', ?)",
+            (HASH_SCHEME,)
+        )
+        self.db.commit()
+        self._migrate_legacy_hashes()
+
+    def _migrate_legacy_hashes(self):
+        """One-time import of the old JSON map and append-only log"""
         hash_file = os.path.join(ARCHIVE_DIR, "processed_hashes.json")
+        log_file = os.path.join(ARCHIVE_DIR, "hashes.log")
+        legacy = {}
         if os.path.exists(hash_file):
             try:
                 with open(hash_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                # If older format (url -> hash string), convert to new dict format
                 now_iso = datetime.now().isoformat()
-                normalized = {}
                 for k, v in data.items():
                     if isinstance(v, str):
-                        normalized[k] = {"hash": v, "timestamp": now_iso}
+                        legacy[k] = {"hash": v, "timestamp": now_iso}
                     elif isinstance(v, dict) and "hash" in v:
-                        normalized[k] = v
-                    else:
-                        # Unexpected format: skip
-                        logger.warning(f"Unexpected processed_hashes entry for {k}: {v}")
-                self.processed_hashes = normalized
+                        legacy[k] = v
+            except Exception as e:
+                logger.warning(f"Could not read legacy processed hashes: {e}")
+        if os.path.exists(log_file):
+            try:
+                with open(log_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                            legacy[entry.pop("url")] = entry
+                        except Exception:
+                            logger.warning(f"Skipping malformed hash log line: {line}")
             except Exception as e:
-                logger.warning(f"Could not load processed hashes: {e}")
-                self.processed_hashes = {}
+                logger.warning(f"Could not replay legacy hash log: {e}")
 
-    def save_processed_hashes(self):
-        """Save processed image hashes to file"""
-        hash_file = os.path.join(ARCHIVE_DIR, "processed_hashes.json")
+        for url, entry in legacy.items():
+            self._store_hash_row(url, entry)
+        if legacy:
+            self.db.commit()
+            logger.info(f"Migrated {len(legacy)} hash records into SQLite")
+        for path in (hash_file, log_file):
+            if os.path.exists(path):
+                try:
+                    os.replace(path, path + ".migrated")
+                except Exception as e:
+                    logger.warning(f"Could not rename migrated file {path}: {e}")
+
+    @staticmethod
+    def _hash_to_blob(hex_hash):
+        """Digest prefixes are stored as raw bytes, halving their size"""
         try:
-            with open(hash_file, 'w', encoding='utf-8') as f:
-                json.dump(self.processed_hashes, f, indent=4)
-        except Exception as e:
-            logger.error(f"Could not save processed hashes: {e}")
+            return bytes.fromhex(hex_hash)
+        except (TypeError, ValueError):
+            return hex_hash  # tolerate odd legacy values as-is
+
+    def _store_hash_row(self, url, entry):
+        self.db.execute(
+            "INSERT OR REPLACE INTO urls (url, hash, timestamp, etag, last_modified)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (url, self._hash_to_blob(entry.get("hash")), entry.get("timestamp"),
+             entry.get("etag"), entry.get("last_modified"))
+        )
 
-    def calculate_file_hash(self, filepath):
-        """Calculate SHA256 hash of a file"""
-        sha256_hash = hashlib.sha256()
+    def get_hash_entry(self, url):
+        """Fetch one URL's hash record, lazily, caching what was seen.
+
+        The table is only ever consulted one URL at a time, so a point
+        SELECT against the primary key replaces the old full-table load at
+        startup - startup cost no longer grows with the history size, and
+        URLs dropped from config.json are never read at all. Rows touched
+        this run are cached in processed_hashes (store_hash writes through
+        it), so each URL costs at most one query per process lifetime.
+        """
+        if url in self.processed_hashes:
+            return self.processed_hashes[url]
         try:
-            with open(filepath, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            with self.db_lock:
+                row = self.db.execute(
+                    "SELECT hash, timestamp, etag, last_modified FROM urls WHERE url = ?",
+                    (url,)
+                ).fetchone()
         except Exception as e:
-            logger.error(f"Error calculating hash for {filepath}: {e}")
+            logger.warning(f"Could not load hash record for {url}: {e}")
             return None
+        if row is None:
+            return None
+        hash_blob, timestamp, etag, last_modified = row
+        entry = {
+            "hash": hash_blob.hex() if isinstance(hash_blob, bytes) else hash_blob,
+            "timestamp": timestamp
+        }
+        if etag:
+            entry["etag"] = etag
+        if last_modified:
+            entry["last_modified"] = last_modified
+        self.processed_hashes[url] = entry
+        return entry
+
+    def store_hash(self, url, entry):
+        """Persist one hash record - a single-row upsert, O(1) per image.
+
+        Durability is per-URL: if the process dies mid-cycle, every image
+        already uploaded keeps its record, unlike the old end-of-run JSON
+        rewrite which forgot the whole cycle.
+        """
+        self.processed_hashes[url] = entry
+        try:
+            with self.db_lock:
+                self._store_hash_row(url, entry)
+                self.db.commit()
+        except Exception as e:
+            logger.warning(f"Could not store hash for {url}: {e}")
 
     def _normalize_image_config(self, image_config):
         """
@@ -112,7 +645,7 @@ class ImageProcessor:
         """
         if isinstance(image_config, str):
             url = image_config.strip()
-            filename = os.path.basename(urlparse(url).path) or None
+            filename = url_filename(url)
             return {"url": url, "filename": filename, "settings": {}}
         elif isinstance(image_config, dict):
             url = image_config.get("url")
@@ -121,21 +654,23 @@ class ImageProcessor:
                 url = image_config.get("source")
             if not url:
                 raise ValueError("image_config missing 'url' key")
-            filename = image_config.get("filename") or os.path.basename(urlparse(url).path)
+            filename = image_config.get("filename") or url_filename(url)
             settings = image_config.get("settings", {})
             return {"url": url.strip(), "filename": filename, "settings": settings}
         else:
             raise TypeError("image_config must be a dict or a string URL")
 
-    def download_image(self, image_config):
-        """Download an image with retry logic"""
-        # Accept either dict or string input
-        try:
-            cfg = self._normalize_image_config(image_config)
-        except Exception as e:
-            logger.error(f"Invalid image_config passed to download_image: {image_config} ({e})")
-            return None
+    def download_image(self, cfg):
+        """Download an image with retry logic.
 
+        cfg must already be normalized (see _normalize_image_config); the
+        pipeline normalizes each image config exactly once at intake.
+        Returns a (source, content_hash) tuple on success, or None when the
+        download was skipped or failed. source is the raw image bytes, kept
+        in memory for the processing stage; when download.keep_originals is
+        set it is the path of the original persisted to DOWNLOAD_DIR
+        instead. The hash is computed once while streaming the response.
+        """
         url = cfg["url"]
         filename = cfg.get("filename") or f"image_{hash(url)}.jpg"
 
@@ -147,60 +682,98 @@ class ImageProcessor:
         headers = {'User-Agent': self.config.get("download", {}).get("user_agent", "ImageProcessor/1.0")}
         max_retries = int(self.config.get("download", {}).get("max_retries", 2))
         timeout = float(self.config.get("download", {}).get("timeout", 30))
-        
+
+        info = self.get_hash_entry(url) or {}
+
+        # Decide the periodic forced reprocess up front: once the window
+        # has elapsed the request must go out unconditional, or a server
+        # honoring the validators would answer 304 and short-circuit the
+        # download before any downstream check could run
+        force_hours = int(self.config.get("download", {}).get("force_redownload_hours", 0))
+        forced = False
+        if force_hours > 0 and info:
+            # parse timestamp safely
+            try:
+                last_download = datetime.fromisoformat(info.get("timestamp"))
+            except Exception:
+                last_download = datetime.now() - timedelta(days=365)
+            forced = datetime.now() - last_download >= timedelta(hours=force_hours)
+
+        # Ask the server to skip the body entirely if nothing changed.
+        # Seeded from the validators stored on the last successful download.
+        if not forced:
+            if info.get("etag"):
+                headers['If-None-Match'] = info["etag"]
+            if info.get("last_modified"):
+                headers['If-Modified-Since'] = info["last_modified"]
+
+        retry_delay = 0.0
         for attempt in range(max_retries + 1):
             try:
                 logger.debug(f"Downloading {url} (attempt {attempt + 1})")
-                response = requests.get(url, headers=headers, timeout=timeout, stream=True)
+                response = self.http.get(url, headers=headers, timeout=timeout, stream=True)
+                if response.status_code == 304:
+                    logger.info(f"Skipping {url} - server reports not modified (304)")
+                    return None
                 response.raise_for_status()
                 
-                # Calculate hash of downloaded content
-                content_hash = hashlib.sha256()
-                temp_file = local_path + ".tmp"
-                
-                with open(temp_file, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            content_hash.update(chunk)
-                
-                current_hash = content_hash.hexdigest()
-                
-                # Check if already downloaded and unchanged (time-based force-redownload)
-                info = self.processed_hashes.get(url)
-                if info and info.get("hash") == current_hash:
-                    # parse timestamp safely
-                    try:
-                        last_download = datetime.fromisoformat(info.get("timestamp"))
-                    except Exception:
-                        last_download = datetime.now() - timedelta(days=365)
-                    max_age_hours = int(self.config.get("download", {}).get("force_redownload_hours", 6))
-                    if datetime.now() - last_download < timedelta(hours=max_age_hours):
-                        logger.info(f"Skipping {url} - no changes detected and downloaded recently")
-                        if os.path.exists(temp_file):
-                            os.remove(temp_file)
-                        return None  # No need to process
-                
-                # Move temp file to final location
-                if os.path.exists(temp_file):
-                    if os.path.exists(local_path):
-                        os.remove(local_path)
-                    os.rename(temp_file, local_path)
-                
-                # Update hash record
-                self.processed_hashes[url] = {
+                # Stream into memory while hashing - the processing stage
+                # decodes straight from this buffer, so the old write-then-
+                # reopen disk round trip disappears. Large chunks keep the
+                # Python loop short and let hashlib release the GIL; each
+                # 1 MiB update dispatches straight into the C digest core,
+                # so files never need a separate mmap/file_digest re-hash.
+                content_hash = new_content_hasher()
+                buf = io.BytesIO()
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        buf.write(chunk)
+                        content_hash.update(chunk)
+
+                current_hash = content_hash.hexdigest()[:HASH_PREFIX_LEN]
+
+                # Unchanged content skips the whole process+upload tail -
+                # that is where nearly all the per-image cost lives. Setting
+                # download.force_redownload_hours > 0 restores the old
+                # periodic forced reprocess of stale-but-unchanged images
+                # (decided above, before the conditional headers went out).
+                if info and info.get("hash") == current_hash and not forced:
+                    logger.info(f"Skipping {url} - no changes detected")
+                    return None  # No need to process
+
+                source = buf.getvalue()
+                if self.config.get("download", {}).get("keep_originals", False):
+                    # Persist the original and hand the path downstream
+                    temp_file = local_path + ".tmp"
+                    with open(temp_file, 'wb') as f:
+                        f.write(source)
+                    # os.replace overwrites atomically in one syscall
+                    os.replace(temp_file, local_path)
+                    source = local_path
+
+                # Update hash record, keeping the validators for the next
+                # conditional request
+                entry = {
                     "hash": current_hash,
                     "timestamp": datetime.now().isoformat()
                 }
-                self.save_processed_hashes()
+                if response.headers.get("ETag"):
+                    entry["etag"] = response.headers["ETag"]
+                if response.headers.get("Last-Modified"):
+                    entry["last_modified"] = response.headers["Last-Modified"]
+                self.store_hash(url, entry)
                 
-                logger.info(f"Downloaded {url} to {local_path}")
-                return local_path
+                if isinstance(source, str):
+                    logger.info(f"Downloaded {url} to {source}")
+                else:
+                    logger.info(f"Downloaded {url} ({len(source)} bytes, in memory)")
+                return source, current_hash
                 
             except Exception as e:
                 if attempt < max_retries:
                     logger.warning(f"Attempt {attempt + 1} failed for {url}: {e}. Retrying...")
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                    retry_delay = backoff_delay(retry_delay)
+                    time.sleep(retry_delay)
                 else:
                     logger.error(f"Failed to download {url} after {max_retries + 1} attempts: {e}")
                     # Record failure for diagnostics
@@ -214,144 +787,36 @@ class ImageProcessor:
        
         return None
 
-    def process_image(self, image_path, image_config):
-        """Process an image according to its specific settings"""
-        try:
-            # Normalize image_config (so we can accept strings upstream)
-            try:
-                cfg = self._normalize_image_config(image_config)
-            except Exception:
-                # If normalization fails, create a minimal cfg using the file path
-                cfg = {"url": None, "filename": os.path.basename(image_path), "settings": {}}
+    def process_image(self, image_src, cfg):
+        """Process an image according to its specific settings.
 
-            # Get settings with fallback to defaults
+        image_src is either raw image bytes or a path to a file on disk.
+        cfg must already be normalized. CPU-heavy PIL work runs in the
+        process pool when one is active (see run()), so worker threads are
+        free to overlap network I/O.
+        """
+        # Merge with defaults, at most once per image config per run -
+        # the defaults never change inside a cycle
+        merged_settings = cfg.get("_merged_settings")
+        if merged_settings is None:
             settings = cfg.get("settings", {}) or {}
-            
-            # Merge with defaults
-            default_settings = self.config.get("processing", {})
-            merged_settings = self.merge_settings(default_settings, settings)
-            
-            # Open image
-            img = Image.open(image_path)
-            
-            # Convert to RGB if necessary (for formats like GIF or PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    try:
-                        img = img.convert('RGBA')
-                    except Exception:
-                        img = img.convert('RGB')
-                if img.mode == 'RGBA':
-                    background.paste(img, mask=img.split()[-1])  # Use alpha channel as mask
-                else:
-                    background.paste(img)
-                img = background
-            
-            original_size = img.size
-            logger.info(f"Processing {os.path.basename(image_path)} - Original size: {original_size}")
-            
-            # Apply crop if specified
-            crop_box = merged_settings.get("crop_box")
-            if crop_box and isinstance(crop_box, list) and len(crop_box) == 4:
-                try:
-                    img = img.crop(crop_box)
-                    logger.info(f"Cropped to: {img.size}")
-                except Exception as e:
-                    logger.warning(f"Could not apply crop {crop_box}: {e}")
-            
-            # Resize logic: Scale up to 4000px (while keeping the aspect ratio)
-            current_width, current_height = img.size
-            max_dim = int(merged_settings.get("max_processing_dimension", 4000))
-            # only scale up the largest dimension to avoid blowing out the other side
-            scale_factor = max_dim / max(current_width, current_height)
-            if scale_factor > 1.0:
-                new_width = int(current_width * scale_factor)
-                new_height = int(current_height * scale_factor)
-                try:
-                    img = img.resize((new_width, new_height), Image.LANCZOS)
-                    logger.info(f"Scaled up to {new_width}x{new_height}")
-                except Exception as e:
-                    logger.warning(f"Could not scale up image: {e}")
-            
-            # Apply auto contrast if requested
-            enhancements = merged_settings.get("enhancements", {}) or {}
-            if enhancements.get("apply_autocontrast", False):
-                try:
-                    img = ImageOps.autocontrast(img)
-                    logger.info("Applied auto contrast")
-                except Exception as e:
-                    logger.warning(f"Could not apply auto contrast: {e}")
-            
-            # Apply other enhancements
-            enhancers = {
-                "sharpness": ImageEnhance.Sharpness,
-                "contrast": ImageEnhance.Contrast,
-                "brightness": ImageEnhance.Brightness,
-                "color": ImageEnhance.Color
-            }
-            
-            for enhancer_name, enhancer_class in enhancers.items():
-                factor = enhancements.get(enhancer_name, 1.0)
-                if factor != 1.0:
-                    try:
-                        enhancer = enhancer_class(img)
-                        img = enhancer.enhance(factor)
-                        logger.info(f"Applied {enhancer_name} with factor {factor}")
-                    except Exception as e:
-                        logger.warning(f"Could not apply {enhancer_name}: {e}")
-            
-            # Apply unsharp mask if specified (keeps your original approach but guarded)
-            unsharp_mask = merged_settings.get("unsharp_mask")
-            if unsharp_mask:
-                try:
-                    radius = unsharp_mask.get("radius", 2)
-                    percent = unsharp_mask.get("percent", 150)
-                    threshold = unsharp_mask.get("threshold", 3)
-                    
-                    blurred = img.filter(ImageFilter.GaussianBlur(radius))
-                    mask = Image.blend(img, blurred, 1.0 - percent / 100.0)
-                    img = Image.blend(img, mask, 1.0)
-                    logger.info(f"Applied unsharp mask with radius={radius}, percent={percent}, threshold={threshold}")
-                except Exception as e:
-                    logger.warning(f"Could not apply unsharp mask: {e}")
-            
-            # Resize down to final size (default 1920px max dimension)
-            resize_to = merged_settings.get("resize_to", [1920, 1920])
-            if isinstance(resize_to, list) and len(resize_to) == 2:
-                target_width, target_height = int(resize_to[0]), int(resize_to[1])
-                current_width, current_height = img.size
-                scale_factor = min(target_width / current_width, target_height / current_height)
-                if scale_factor < 1.0:
-                    new_width = int(current_width * scale_factor)
-                    new_height = int(current_height * scale_factor)
-                    try:
-                        img = img.resize((new_width, new_height), Image.LANCZOS)
-                        logger.info(f"Resized down to {new_width}x{new_height}")
-                    except Exception as e:
-                        logger.warning(f"Could not resize down image: {e}")
-            
-            # Prepare output filename
-            out_filename = cfg.get("filename") or os.path.splitext(os.path.basename(image_path))[0] + ".webp"
-            if not out_filename.endswith(".webp"):
-                out_filename = os.path.splitext(out_filename)[0] + ".webp"
-            
-            output_path = os.path.join(PROCESSED_DIR, out_filename)
-            
-            # Save as WebP
-            quality = int(merged_settings.get("quality", 60))
-            try:
-                img.save(output_path, "WEBP", quality=quality, method=6)
-                logger.info(f"Saved processed image to {output_path}")
-            except Exception as e:
-                logger.error(f"Failed to save processed image to {output_path}: {e}")
-                return None
-            
-            return output_path
+            merged_settings = self.merge_settings(self.default_settings, settings)
+            cfg["_merged_settings"] = merged_settings
 
-        except Exception as e:
-            logger.error(f"Error processing {image_path}: {e}")
-            return None
+        # Prepare output filename
+        out_filename = cfg.get("filename")
+        if not out_filename and isinstance(image_src, str):
+            out_filename = os.path.splitext(os.path.basename(image_src))[0] + ".webp"
+        if not out_filename:
+            out_filename = f"image_{hash(cfg.get('url'))}.webp"
+        if not out_filename.endswith(".webp"):
+            out_filename = os.path.splitext(out_filename)[0] + ".webp"
+
+        if self.process_pool is not None:
+            return self.process_pool.submit(
+                process_image_file, image_src, out_filename, merged_settings
+            ).result()
+        return process_image_file(image_src, out_filename, merged_settings)
 
     def merge_settings(self, default, specific):
         """Merge default settings with image-specific settings"""
@@ -377,172 +842,285 @@ class ImageProcessor:
         
         return result
 
-    def upload_via_ftp(self, local_path, remote_filename):
-        """Upload a file via FTP with retry logic"""
+    def _ftp_connect(self):
+        """Open, log in and position a fresh FTP session"""
         ftp_config = self.config.get("ftp", {})
-        max_retries = int(ftp_config.get("max_retries", 2))
         timeout = float(ftp_config.get("timeout", 30))
-        
-        for attempt in range(max_retries + 1):
-            ftp = None
+
+        ftp = _TunedFTP()
+        ftp.connect(ftp_config["host"], ftp_config.get("port", 21), timeout=timeout)
+        ftp.login(ftp_config["username"], ftp_config["password"])
+        ftp.set_pasv(True)
+        try:
+            ftp.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            pass
+
+        # Change to remote directory
+        remote_dir = ftp_config.get("remote_directory", "/")
+        try:
+            ftp.cwd(remote_dir)
+        except Exception:
+            # Try to create directory if it doesn't exist
+            dirs = remote_dir.strip('/').split('/')
+            current_path = ''
+            for dir_name in dirs:
+                if dir_name:
+                    current_path += '/' + dir_name
+                    try:
+                        ftp.cwd(current_path)
+                    except Exception:
+                        try:
+                            ftp.mkd(current_path)
+                            ftp.cwd(current_path)
+                        except Exception:
+                            pass
+        return ftp
+
+    def _acquire_ftp(self):
+        """Reuse a pooled session, or connect a new one if the pool is dry.
+
+        Pooled sessions are probed with a NOOP first; a server-side idle
+        timeout otherwise surfaces as a confusing mid-upload failure.
+        """
+        while True:
             try:
-                ftp = ftplib.FTP()
-                ftp.connect(ftp_config["host"], ftp_config.get("port", 21), timeout=timeout)
-                ftp.login(ftp_config["username"], ftp_config["password"])
-                
-                # Change to remote directory
-                remote_dir = ftp_config.get("remote_directory", "/")
+                ftp = self.ftp_pool.get_nowait()
+            except queue.Empty:
+                return self._ftp_connect()
+            try:
+                ftp.voidcmd("NOOP")
+                return ftp
+            except Exception:
                 try:
-                    ftp.cwd(remote_dir)
+                    ftp.close()
                 except Exception:
-                    # Try to create directory if it doesn't exist
-                    dirs = remote_dir.strip('/').split('/')
-                    current_path = ''
-                    for dir_name in dirs:
-                        if dir_name:
-                            current_path += '/' + dir_name
-                            try:
-                                ftp.cwd(current_path)
-                            except Exception:
-                                try:
-                                    ftp.mkd(current_path)
-                                    ftp.cwd(current_path)
-                                except Exception:
-                                    pass
-                
-                # Upload file
-                with open(local_path, 'rb') as f:
-                    ftp.storbinary(f'STOR {remote_filename}', f)
-                
-                if ftp:
-                    ftp.quit()
-                
-                logger.info(f"Successfully uploaded {local_path} to {remote_filename}")
+                    pass
+
+    def close_ftp_pool(self):
+        """Quit all pooled FTP sessions (called at end of cycle)"""
+        while True:
+            try:
+                ftp = self.ftp_pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ftp.quit()
+            except Exception:
+                pass
+
+    def upload_via_ftp(self, data, remote_filename, label=None):
+        """Upload via FTP with retry logic, reusing pooled sessions.
+
+        data is either in-memory bytes (the normal case) or a path to a
+        file on disk; a fresh file object is built per attempt so retries
+        always start from the beginning.
+        """
+        ftp_config = self.config.get("ftp", {})
+        max_retries = int(ftp_config.get("max_retries", 2))
+        label = label or remote_filename
+
+        retry_delay = 0.0
+        for attempt in range(max_retries + 1):
+            ftp = None
+            try:
+                ftp = self._acquire_ftp()
+
+                # Upload; 1 MiB blocks keep the syscall count low
+                if isinstance(data, (bytes, bytearray)):
+                    f = io.BytesIO(data)
+                else:
+                    f = open(data, 'rb')
+                with f:
+                    ftp.storbinary(f'STOR {remote_filename}', f, blocksize=1 << 20)
+
+                # Session still healthy - hand it back for the next upload
+                self.ftp_pool.put(ftp)
+
+                logger.info(f"Successfully uploaded {label} to {remote_filename}")
                 return True
-                
+
             except Exception as e:
+                # Don't pool a session in an unknown state
                 if ftp:
                     try:
                         ftp.quit()
                     except Exception:
                         pass
-                
+
                 if attempt < max_retries:
-                    logger.warning(f"FTP upload attempt {attempt + 1} failed for {local_path}: {e}. Retrying...")
-                    time.sleep(2 ** attempt)
+                    logger.warning(f"FTP upload attempt {attempt + 1} failed for {label}: {e}. Retrying...")
+                    retry_delay = backoff_delay(retry_delay)
+                    time.sleep(retry_delay)
                 else:
-                    logger.error(f"Failed to upload {local_path} after {max_retries + 1} attempts: {e}")
+                    logger.error(f"Failed to upload {label} after {max_retries + 1} attempts: {e}")
                     return False
-        
+
         return False
 
+    def _delete_files_older_than(self, directory, cutoff_ts, label="file"):
+        """Remove regular files in directory with mtime before cutoff_ts.
+
+        os.scandir reuses the stat data fetched with each dirent, so this
+        costs one syscall per entry instead of the two a listdir+getmtime
+        loop pays; the cutoff is compared as a raw timestamp.
+        """
+        if not os.path.exists(directory):
+            return
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file() and entry.stat().st_mtime < cutoff_ts:
+                            os.unlink(entry.path)
+                            logger.info(f"Deleted old {label}: {entry.path}")
+                    except Exception as e:
+                        logger.warning(f"Could not delete {entry.path}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not scan {directory}: {e}")
+
     def cleanup_old_files(self):
         """Delete files older than retention period (only for downloads and processed dirs)"""
         # Only clean up download and processed directories, NOT archive
         retention_days = int(self.config.get("retention", {}).get("days_to_keep", 14))
-        cutoff_date = datetime.now() - timedelta(days=retention_days)
-        
-        directories = [DOWNLOAD_DIR, PROCESSED_DIR]  # Exclude ARCHIVE_DIR
-        
-        for directory in directories:
-            if os.path.exists(directory):
-                for filename in os.listdir(directory):
-                    filepath = os.path.join(directory, filename)
-                    try:
-                        mod_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                        if mod_time < cutoff_date:
-                            os.remove(filepath)
-                            logger.info(f"Deleted old file: {filepath}")
-                    except Exception as e:
-                        logger.warning(f"Could not delete {filepath}: {e}")
+        cutoff_ts = (datetime.now() - timedelta(days=retention_days)).timestamp()
+
+        for directory in [DOWNLOAD_DIR, PROCESSED_DIR]:  # Exclude ARCHIVE_DIR
+            self._delete_files_older_than(directory, cutoff_ts)
 
     def cleanup_old_archive_files(self):
         """Delete archive files older than 14 days"""
         retention_days = int(self.config.get("retention", {}).get("archive_days", 14))
-        cutoff_date = datetime.now() - timedelta(days=retention_days)
-        
-        if os.path.exists(ARCHIVE_DIR):
-            for filename in os.listdir(ARCHIVE_DIR):
-                filepath = os.path.join(ARCHIVE_DIR, filename)
-                try:
-                    mod_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    if mod_time < cutoff_date:
-                        os.remove(filepath)
-                        logger.info(f"Deleted old archive file: {filepath}")
-                except Exception as e:
-                    logger.warning(f"Could not delete {filepath}: {e}")
+        cutoff_ts = (datetime.now() - timedelta(days=retention_days)).timestamp()
+
+        self._delete_files_older_than(ARCHIVE_DIR, cutoff_ts, label="archive file")
 
     def get_timestamped_filename(self, original_filename):
-        """Add timestamp to filename to prevent overwrites"""
-        # Get current timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
+        """Add timestamp to filename to prevent overwrites.
+
+        The format has 1-second granularity, so every image in a cycle got
+        the same string anyway; run() stamps the cycle once and the per-
+        image clock read + strftime goes away. The live read remains only
+        as a fallback for calls outside a cycle.
+        """
+        timestamp = self.run_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
         # Split filename and extension
         name, ext = os.path.splitext(original_filename)
-        
+
         # Add timestamp before the extension
         return f"{name}_{timestamp}{ext}"
 
-    def process_single_image(self, image_config):
-        """Process a single image from download to upload"""
+    def upload_and_archive(self, out_filename, webp_data, source, cfg):
+        """Upload an encoded image from memory, then archive/clean up.
+
+        webp_data is the WebP bytes produced by process_image - they are
+        streamed to FTP directly, so the common path never writes to
+        PROCESSED_DIR at all. Disk is only touched to archive a copy, to
+        keep the processed file when delete_after_upload is off, or to
+        preserve the bytes for diagnostics when the upload fails. source
+        is the original image - a DOWNLOAD_DIR path when keep_originals
+        persisted it, otherwise the in-memory bytes (which need no
+        cleanup).
+        """
+        # Get remote filename (based on cfg)
+        remote_filename = cfg.get("filename") or os.path.basename(cfg.get("url") or out_filename)
+        if not remote_filename.endswith(".webp"):
+            remote_filename = os.path.splitext(remote_filename)[0] + ".webp"
+
+        # Upload via FTP straight from memory
+        upload_success = self.upload_via_ftp(webp_data, remote_filename, label=out_filename)
+
+        retention = self.config.get("retention", {})
+        delete_after = retention.get("delete_after_upload", True)
+        archive_after = retention.get("archive_after_upload", True)
+        try:
+            if upload_success:
+                if delete_after and isinstance(source, str) and os.path.exists(source):
+                    os.remove(source)
+
+                if not delete_after:
+                    # Keep a processed copy on disk as before
+                    processed_path = os.path.join(PROCESSED_DIR, out_filename)
+                    with open(processed_path, "wb") as f:
+                        f.write(webp_data)
+
+                if archive_after:
+                    # Add timestamp to prevent overwrites in archive
+                    timestamped_filename = self.get_timestamped_filename(out_filename)
+                    archive_path = os.path.join(ARCHIVE_DIR, timestamped_filename)
+                    with open(archive_path, "wb") as f:
+                        f.write(webp_data)
+                    logger.info(f"Archived {out_filename} with timestamp: {timestamped_filename}")
+            else:
+                # Don't lose the encode - park it in PROCESSED_DIR so it
+                # can be inspected or uploaded by hand
+                failed_path = os.path.join(PROCESSED_DIR, out_filename)
+                with open(failed_path, "wb") as f:
+                    f.write(webp_data)
+                logger.warning(f"Upload failed; kept encoded image at {failed_path}")
+        except Exception as e:
+            logger.warning(f"Could not clean up files after upload: {e}")
+
+        return upload_success
+
+    def _log_url(self, image_config):
+        """Best-effort URL extraction for log messages"""
         try:
-            # Normalize image_config
+            return image_config.get("url", "unknown") if isinstance(image_config, dict) else image_config
+        except Exception:
+            return "unknown"
+
+    def _download_worker(self, dl_q, proc_q):
+        """Stage 1: pull image configs, stream downloads, feed the processors"""
+        while True:
+            image_config = dl_q.get()
+            if image_config is None:
+                break
             try:
                 cfg = self._normalize_image_config(image_config)
+                result = self.download_image(cfg)
+                if result:
+                    source, content_hash = result
+                    proc_q.put((source, content_hash, cfg))
             except Exception as e:
-                logger.error(f"Invalid image_config in process_single_image: {image_config} ({e})")
-                return False
-
-            # Download image
-            downloaded_path = self.download_image(cfg)
-            if not downloaded_path:
-                return False
-            
-            # Process image
-            processed_path = self.process_image(downloaded_path, cfg)
-            if not processed_path:
-                return False
-            
-            # Get remote filename (based on cfg)
-            remote_filename = cfg.get("filename") or os.path.basename(cfg.get("url") or processed_path)
-            if not remote_filename.endswith(".webp"):
-                remote_filename = os.path.splitext(remote_filename)[0] + ".webp"
-            
-            # Upload via FTP
-            upload_success = self.upload_via_ftp(processed_path, remote_filename)
-            
-            # Cleanup if configured - ONLY move to archive after successful upload
-            if upload_success and self.config.get("retention", {}).get("delete_after_upload", True):
-                try:
-                    if os.path.exists(downloaded_path):
-                        os.remove(downloaded_path)
-                    
-                    if os.path.exists(processed_path):
-                        # Add timestamp to prevent overwrites in archive
-                        timestamped_filename = self.get_timestamped_filename(os.path.basename(processed_path))
-                        archive_path = os.path.join(ARCHIVE_DIR, timestamped_filename)
-                        
-                        # Move processed image to archive with timestamp
-                        shutil.move(processed_path, archive_path)
-                        logger.info(f"Moved {processed_path} to archive with timestamp: {timestamped_filename}")
-                except Exception as e:
-                    logger.warning(f"Could not clean up files after upload: {e}")
-            
-            return upload_success
-            
-        except Exception as e:
-            # Best-effort: log the URL if available
+                logger.error(f"Error downloading {self._log_url(image_config)}: {e}")
+
+    def _process_worker(self, proc_q, up_q):
+        """Stage 2: dispatch CPU work to the process pool, feed the uploaders"""
+        while True:
+            item = proc_q.get()
+            if item is None:
+                break
+            source, content_hash, cfg = item
             try:
-                url_for_log = image_config.get("url", "unknown") if isinstance(image_config, dict) else image_config
-            except Exception:
-                url_for_log = "unknown"
-            logger.error(f"Error processing image {url_for_log}: {e}")
-            return False
+                processed = self.process_image(source, cfg)
+                if processed:
+                    out_filename, webp_data = processed
+                    up_q.put((out_filename, webp_data, source, cfg))
+            except Exception as e:
+                logger.error(f"Error processing {self._log_url(cfg)}: {e}")
+
+    def _upload_worker(self, up_q, counters):
+        """Stage 3: drain processed images into the pooled FTP sessions"""
+        while True:
+            item = up_q.get()
+            if item is None:
+                break
+            out_filename, webp_data, source, cfg = item
+            try:
+                if self.upload_and_archive(out_filename, webp_data, source, cfg):
+                    with counters["lock"]:
+                        counters["success"] += 1
+            except Exception as e:
+                logger.error(f"Error uploading {self._log_url(cfg)}: {e}")
 
     def run(self):
         """Main execution method"""
         logger.info("Starting image processing workflow")
-        
+        # One archive timestamp per cycle (see get_timestamped_filename)
+        self.run_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
         # Cleanup old files if configured (only downloads and processed dirs)
         if self.config.get("retention", {}).get("cleanup_on_start", True):
             self.cleanup_old_files()
@@ -559,37 +1137,65 @@ class ImageProcessor:
             logger.warning("No images configured for processing")
             return
         
-        # Process images concurrently
-        max_workers = int(self.config.get("ftp", {}).get("concurrent_uploads", 5))
-        success_count = 0
+        # Three-stage producer-consumer pipeline over bounded queues:
+        # downloaders (network-bound, many) -> processors (CPU-bound, one
+        # per core, dispatching into the process pool) -> uploaders
+        # (network-bound, matched to the FTP session pool). Each stage runs
+        # while the others do, so network latency hides behind CPU work.
+        n_upload = int(self.config.get("ftp", {}).get("concurrent_uploads", 5))
+        n_download = int(self.config.get("download", {}).get("concurrent_downloads", n_upload))
+        n_process = int(self.config.get("processing", {}).get("workers", os.cpu_count() or 1))
         total_count = len(images)
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_image = {
-                executor.submit(self.process_single_image, image_config): image_config 
-                for image_config in images
-            }
-            
-            # Wait for completion
-            for future in as_completed(future_to_image):
-                image_config = future_to_image[future]
-                try:
-                    success = future.result()
-                    if success:
-                        success_count += 1
-                except Exception as e:
-                    # Best-effort to extract URL for logging
-                    try:
-                        url_for_log = image_config.get("url", "unknown") if isinstance(image_config, dict) else image_config
-                    except Exception:
-                        url_for_log = "unknown"
-                    logger.error(f"Exception processing {url_for_log}: {e}")
+
+        dl_q = queue.Queue()
+        proc_q = queue.Queue(maxsize=2 * n_process)
+        up_q = queue.Queue(maxsize=2 * n_upload)
+        counters = {"success": 0, "lock": threading.Lock()}
+
+        for image_config in images:
+            dl_q.put(image_config)
+        for _ in range(n_download):
+            dl_q.put(None)  # sentinel: one per downloader
+
+        self.process_pool = ProcessPoolExecutor(max_workers=n_process,
+                                               initializer=_init_worker_logging)
+        try:
+            downloaders = [threading.Thread(target=self._download_worker, args=(dl_q, proc_q))
+                           for _ in range(n_download)]
+            processors = [threading.Thread(target=self._process_worker, args=(proc_q, up_q))
+                          for _ in range(n_process)]
+            uploaders = [threading.Thread(target=self._upload_worker, args=(up_q, counters))
+                         for _ in range(n_upload)]
+            for t in downloaders + processors + uploaders:
+                t.start()
+
+            # Propagate shutdown stage by stage
+            for t in downloaders:
+                t.join()
+            for _ in processors:
+                proc_q.put(None)
+            for t in processors:
+                t.join()
+            for _ in uploaders:
+                up_q.put(None)
+            for t in uploaders:
+                t.join()
+        finally:
+            self.process_pool.shutdown()
+            self.process_pool = None
+            self.close_ftp_pool()
+
+        success_count = counters["success"]
         
         logger.info(f"Workflow completed: {success_count}/{total_count} images processed successfully")
 
 def main():
     """Main function to run the processor and scheduler"""
+    # Resize/filter throughput depends heavily on which Pillow build is
+    # installed (pillow-simd is a drop-in ~4-6x speedup on these ops), so
+    # record it where it can be checked after the fact (pillow-simd keeps
+    # a .postN suffix in its version string)
+    logger.info(f"Pillow {PIL.__version__}")
     processor = ImageProcessor()
     
     # Set log level from config
@@ -608,10 +1214,15 @@ def main():
     
     logger.info(f"Scheduler started. Next run in {interval_minutes} minutes.")
     
-    # Keep the script running
+    # Keep the script running; sleep exactly until the next job is due
+    # instead of polling every 5 minutes (which added up to 5 min jitter)
     while True:
+        idle = schedule.idle_seconds()
+        if idle is None:
+            break  # no jobs scheduled
+        if idle > 0:
+            time.sleep(idle)
         schedule.run_pending()
-        time.sleep(300)  # Check every 5 minutes
 
 if __name__ == "__main__":
     main()